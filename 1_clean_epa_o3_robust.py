@@ -7,44 +7,80 @@ Place this file in your project folder and run:
   python 1_clean_epa_o3_robust.py
 
 Outputs:
-  - Cleaned_EPA_O3_Monthly.csv
+  - Cleaned_EPA_O3_Monthly.parquet
+  - Cleaned_EPA_O3_Monthly.csv (for the ETL jobs that discover/read the CSV)
 This script prints a short diagnostics table to the terminal as it runs.
 """
 
 import pandas as pd
+import numpy as np
 import glob, os, re
-from dateutil import parser
 
 # --- helper functions -----------------------------------------------------
+# precompiled patterns (compiled once at import instead of per re.search call)
+_DATE_PREFS = ('date local', 'date_local', 'date', 'measurement date', 'utc')
+_DATE_RE = re.compile(r'date', re.I)
+_O3_RES = [re.compile(p, re.I) for p in (
+    r'arithmetic', r'8-?hour', r'daily.*max', r'o3', r'ozone', r'daily.*obs', r'daily.*avg',
+    r'Daily Max 8-hour Ozone Concentration', r'PM2.5', r'VALUE'  # some fallbacks
+)]
+_UNIT_RE = re.compile(r'units?', re.I)
+
+# optional numba kernel: fuses the mask/branch/multiply into one pass with no
+# intermediate arrays; falls back to np.select when numba is not installed
+try:
+    from numba import njit
+
+    @njit(cache=True, fastmath=True)
+    def _convert_ozone(values, unit_code):
+        out = np.empty_like(values)
+        for i in range(values.size):
+            c = unit_code[i]
+            if c == 1:        # ppm
+                out[i] = values[i] * 2140.0
+            elif c == 2:      # ppb
+                out[i] = values[i] * 2.14
+            else:             # already µg/m3
+                out[i] = values[i]
+        return out
+except ImportError:
+    _convert_ozone = None
+
+# detection results per header set — EPA files share identical headers across
+# years, so the regex scans run once, not once per file
+_COL_CACHE = {}
+
+def detect_columns(cols):
+    key = tuple(cols)
+    hit = _COL_CACHE.get(key)
+    if hit is None:
+        hit = (find_date_column(cols), find_o3_column(cols), find_unit_column(cols))
+        _COL_CACHE[key] = hit
+    return hit
+
 def find_date_column(cols):
     # prefer exact matches, then keywords
-    prefs = ['date local', 'date_local', 'date', 'measurement date', 'utc']
-    for p in prefs:
-        for c in cols:
-            if c.strip().lower() == p:
-                return c
+    lowered = {c.strip().lower(): c for c in cols}
+    for p in _DATE_PREFS:
+        if p in lowered:
+            return lowered[p]
     # then search for any column containing 'date'
     for c in cols:
-        if re.search(r'date', c, re.I):
+        if _DATE_RE.search(c):
             return c
     return None
 
 def find_o3_column(cols):
     # match common O3 names / patterns used in your files
-    patterns = [
-        r'arithmetic', r'8-?hour', r'daily.*max', r'o3', r'ozone', r'daily.*obs', r'daily.*avg',
-        r'Daily Max 8-hour Ozone Concentration', r'PM2.5', r'VALUE'  # some fallbacks
-    ]
-    # first try exact-case-insensitive match among columns
-    for p in patterns:
+    for rx in _O3_RES:
         for c in cols:
-            if re.search(p, c, re.I):
+            if rx.search(c):
                 return c
     return None
 
 def find_unit_column(cols):
     for c in cols:
-        if re.search(r'unit', c, re.I) or re.search(r'units', c, re.I):
+        if _UNIT_RE.search(c):
             return c
     # sometimes unit is part of header like "Units of Measure"
     for c in cols:
@@ -52,33 +88,6 @@ def find_unit_column(cols):
             return c
     return None
 
-def parse_date_safe(x):
-    try:
-        return pd.to_datetime(x)
-    except Exception:
-        try:
-            return pd.to_datetime(parser.parse(str(x)))
-        except Exception:
-            return pd.NaT
-
-def to_ugm3(val, unit):
-    if pd.isna(unit):
-        return val
-    s = str(unit).lower()
-    try:
-        v = float(val)
-    except:
-        return float('nan')
-    if 'ppm' in s:
-        return v * 2140.0
-    if 'µg' in s or 'ug' in s or 'ug/m3' in s or 'µg/m' in s:
-        return v
-    # some datasets store "ppb" — convert 1 ppb O3 ≈ 2.14 µg/m3 (temp dependent). We'll assume 25°C:
-    if 'ppb' in s:
-        return v * 2.14
-    # fallback: assume provided value already in µg/m3
-    return v
-
 # --- main ---------------------------------------------------------------
 files = sorted(glob.glob("EPAair_O3_GaringerNC*_raw.csv"))
 if not files:
@@ -92,7 +101,11 @@ warnings = []
 for f in files:
     print("\n--- Loading:", os.path.basename(f))
     try:
-        df = pd.read_csv(f, low_memory=False)
+        try:
+            # prefer the multithreaded pyarrow parser when available
+            df = pd.read_csv(f, engine='pyarrow', dtype_backend='pyarrow')
+        except (ImportError, ValueError):
+            df = pd.read_csv(f)
     except Exception as e:
         print("  ERROR reading file:", e)
         warnings.append((f, "read_error", str(e)))
@@ -102,9 +115,7 @@ for f in files:
     all_cols[os.path.basename(f)] = cols
     print("  Columns (first 12):", cols[:12])
 
-    date_col = find_date_column(cols)
-    o3_col = find_o3_column(cols)
-    unit_col = find_unit_column(cols)
+    date_col, o3_col, unit_col = detect_columns(cols)
 
     if date_col is None or o3_col is None:
         # print brief hint and skip file
@@ -116,23 +127,13 @@ for f in files:
     df = df.rename(columns={date_col: 'Date_raw', o3_col: 'O3_raw'})
     if unit_col:
         df = df.rename(columns={unit_col: 'Unit_raw'})
-
-    # parse date robustly
-    df['Date_parsed'] = df['Date_raw'].apply(parse_date_safe)
-    df = df.dropna(subset=['Date_parsed'])
-    # convert O3 numeric
-    df['O3_raw'] = pd.to_numeric(df['O3_raw'], errors='coerce')
-    df = df.dropna(subset=['O3_raw'])
-
-    if 'Unit_raw' in df.columns:
-        df['Unit_raw'] = df['Unit_raw'].astype(str)
-        df['O3_ug_m3'] = df.apply(lambda r: to_ugm3(r['O3_raw'], r['Unit_raw']), axis=1)
     else:
-        # No unit column: assume numeric is already µg/m3 or arithmetic mean; still keep raw
-        df['O3_ug_m3'] = df['O3_raw']
+        # No unit column: treated as already-µg/m3 by the combined conversion
+        df['Unit_raw'] = pd.NA
 
-    parsed = df[['Date_parsed','O3_ug_m3']].rename(columns={'Date_parsed':'Date'})
-    parsed_frames.append(parsed)
+    # defer parsing/conversion: collect raw columns only, so the vectorized
+    # cleaning below runs once over the combined frame instead of per file
+    parsed_frames.append(df[['Date_raw', 'O3_raw', 'Unit_raw']])
 
 # summary of columns detected
 print("\n=== Column diagnostics across files ===")
@@ -150,16 +151,39 @@ if not parsed_frames:
     raise SystemExit("No files parsed successfully. See warnings above.")
 
 epa = pd.concat(parsed_frames, ignore_index=True)
-epa['Date'] = pd.to_datetime(epa['Date'])
-epa = epa.set_index('Date').sort_index()
-
-# resample monthly mean
-epa_monthly = epa.resample('M').mean()
-epa_monthly = epa_monthly.reset_index()
-epa_monthly['Date'] = epa_monthly['Date'].dt.to_period('M').dt.to_timestamp()
-
-# save
-out = "Cleaned_EPA_O3_Monthly.csv"
-epa_monthly.to_csv(out, index=False)
-print(f"\nSaved cleaned monthly EPA O3 -> {out} (rows: {len(epa_monthly)})")
+
+# one vectorized cleaning pass over the combined frame
+epa['Date'] = pd.to_datetime(epa['Date_raw'], errors='coerce', format='mixed')
+epa['O3_raw'] = pd.to_numeric(epa['O3_raw'], errors='coerce')
+
+# vectorized unit conversion: units repeat heavily, so cast to category and
+# test each distinct unit string once, then gather by code
+# ppm -> *2140; ppb -> *2.14 (1 ppb O3 ≈ 2.14 µg/m3 at 25°C); else assume µg/m3
+u = epa['Unit_raw'].astype(str).astype('category')
+cat_lower = u.cat.categories.str.lower()
+codes = u.cat.codes.to_numpy()
+ppm = np.asarray(cat_lower.str.contains('ppm'))[codes]
+ppb = np.asarray(cat_lower.str.contains('ppb'))[codes]
+v = epa['O3_raw'].to_numpy(dtype=np.float64)
+if _convert_ozone is not None:
+    unit_code = np.where(ppm, 1, np.where(ppb, 2, 0)).astype(np.int8)
+    converted = _convert_ozone(v, unit_code)
+else:
+    converted = np.select([ppm, ppb], [v * 2140.0, v * 2.14], default=v)
+# float32 is plenty for 3-4 significant digits and halves downstream bandwidth
+epa['O3_ug_m3'] = converted.astype(np.float32)
+
+epa = epa.dropna(subset=['Date', 'O3_ug_m3'])[['Date', 'O3_ug_m3']]
+
+# monthly mean — the Grouper emits month-start stamps directly, so no
+# set_index/resample/reset_index/to_period post-processing is needed
+epa_monthly = epa.groupby(pd.Grouper(key='Date', freq='MS'), as_index=False, sort=True).mean(numeric_only=True)
+
+# save (Parquet keeps dtypes, so downstream stages skip date re-parsing);
+# also emit the CSV sibling that the ETL jobs default to / auto-discover
+# (py_etl_parquet_with_metadata.py --csv, spark_etl_parquet.py find_cleaned_csv)
+out = "Cleaned_EPA_O3_Monthly.parquet"
+epa_monthly.to_parquet(out, engine='pyarrow', compression='zstd', index=False)
+epa_monthly.to_csv("Cleaned_EPA_O3_Monthly.csv", index=False)
+print(f"\nSaved cleaned monthly EPA O3 -> {out} (+ csv, rows: {len(epa_monthly)})")
 print(epa_monthly.head(12))
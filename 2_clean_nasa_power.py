@@ -5,7 +5,14 @@ import numpy as np
 file = "NASA_POWER_Garinger_2010_2019.csv"
 
 # load (skiprows may need adjustment if file has different header length)
-df = pd.read_csv(file, skiprows=10, low_memory=False)
+# explicit dtypes skip the two-pass inference and halve peak memory
+NASA_DTYPES = {'YEAR': np.int16, 'DOY': np.int16, 'T2M': np.float32, 'PRECTOTCORR': np.float32}
+try:
+    # pyarrow engine: parallel parse; accepts skiprows (but chokes on the
+    # ragged metadata preamble on some files — fall back to the C engine)
+    df = pd.read_csv(file, skiprows=10, dtype=NASA_DTYPES, engine='pyarrow', dtype_backend='pyarrow')
+except Exception:
+    df = pd.read_csv(file, skiprows=10, dtype=NASA_DTYPES)
 print("Columns found:", list(df.columns))
 print("\nFirst few rows:\n", df.head())
 
@@ -15,11 +22,13 @@ if not {'YEAR','DOY'}.issubset(set(df.columns)):
 
 # Build Date from YEAR + DOY (DOY = day of year)
 # Some DOY values may be floats -> convert to int
-df['YEAR'] = df['YEAR'].astype(int)
-df['DOY'] = df['DOY'].astype(int)
+years = df['YEAR'].to_numpy(dtype=np.int32)
+doys = df['DOY'].to_numpy(dtype=np.int32)
 
-# Create Date: Jan 1st of YEAR + (DOY - 1) days
-df['Date'] = pd.to_datetime(df['YEAR'].astype(str) + '-01-01') + pd.to_timedelta(df['DOY'] - 1, unit='D')
+# Create Date: Jan 1st of YEAR + (DOY - 1) days, as pure datetime64 arithmetic
+# (no string formatting / per-row parse)
+starts = (years - 1970).astype('datetime64[Y]').astype('datetime64[D]')
+df['Date'] = pd.DatetimeIndex(starts + (doys - 1).astype('timedelta64[D]'))
 
 # Pick relevant variables (adjust names if your file uses different codes)
 # T2M = temperature at 2m, PRECTOTCORR = precipitation corrected
@@ -66,7 +75,10 @@ nasa_monthly = df.resample('M').agg(agg_map).reset_index()
 # convert index to month start for consistency (optional)
 nasa_monthly['Date'] = nasa_monthly['Date'].dt.to_period('M').dt.to_timestamp()
 
-out = 'Cleaned_NASA_POWER_Monthly.csv'
-nasa_monthly.to_csv(out, index=False)
-print(f"\n✅ Saved {out} (rows: {len(nasa_monthly)})")
+# Parquet for the pipeline, plus the CSV sibling the ETL jobs auto-discover
+# (same dual-emit as 1_clean_epa_o3_robust.py)
+out = 'Cleaned_NASA_POWER_Monthly.parquet'
+nasa_monthly.to_parquet(out, engine='pyarrow', compression='zstd', index=False)
+nasa_monthly.to_csv('Cleaned_NASA_POWER_Monthly.csv', index=False)
+print(f"\n✅ Saved {out} (+ csv, rows: {len(nasa_monthly)})")
 print(nasa_monthly.head(12))
@@ -7,51 +7,54 @@ Usage:
     python 3_merge_datasets.py
 
 Outputs:
-    - Merged_Dataset.csv
+    - Merged_Dataset.parquet
 """
 
 import pandas as pd
 import os
 
+def read_csv_fast(fn, **kwargs):
+    """Read a CSV with the multithreaded pyarrow engine, falling back to the default."""
+    try:
+        return pd.read_csv(fn, engine='pyarrow', dtype_backend='pyarrow', **kwargs)
+    except Exception:
+        return pd.read_csv(fn, **kwargs)
+
 # --- helper to try multiple filenames for landcover ---
 def try_load_landcover(candidates):
     for fn in candidates:
         if os.path.exists(fn):
             print(f"Loading landcover from: {fn}")
             try:
-                lc = pd.read_csv(fn)
+                lc = read_csv_fast(fn)
                 return lc, fn
             except Exception as e:
                 print(f"  Failed to read {fn}: {e}")
     return None, None
 
 # --- load cleaned monthly EPA O3 ---
-epa_fn = "Cleaned_EPA_O3_Monthly.csv"
+# Parquet intermediates preserve the Date dtype, so no re-parse is needed
+epa_fn = "Cleaned_EPA_O3_Monthly.parquet"
 if not os.path.exists(epa_fn):
     raise SystemExit(f"EPA file not found: {epa_fn} — please run 1_clean_epa_o3_robust.py first")
 
-epa = pd.read_csv(epa_fn)
-epa['Date'] = pd.to_datetime(epa['Date'], errors='coerce')
-epa = epa.dropna(subset=['Date']).sort_values('Date').reset_index(drop=True)
+epa = pd.read_parquet(epa_fn)
+epa = epa.sort_values('Date').reset_index(drop=True)
 print(f"Loaded EPA: {epa_fn} rows={len(epa)} columns={epa.columns.tolist()}")
 
 # --- load cleaned NASA POWER monthly ---
-nasa_fn = "Cleaned_NASA_POWER_Monthly.csv"
+nasa_fn = "Cleaned_NASA_POWER_Monthly.parquet"
 if not os.path.exists(nasa_fn):
     raise SystemExit(f"NASA file not found: {nasa_fn} — please run 2_clean_nasa_power.py first")
 
-nasa = pd.read_csv(nasa_fn)
-nasa['Date'] = pd.to_datetime(nasa['Date'], errors='coerce')
-nasa = nasa.dropna(subset=['Date']).sort_values('Date').reset_index(drop=True)
+nasa = pd.read_parquet(nasa_fn)
+nasa = nasa.sort_values('Date').reset_index(drop=True)
 print(f"Loaded NASA: {nasa_fn} rows={len(nasa)} columns={nasa.columns.tolist()}")
 
 # --- align ranges: keep intersection (inner join on Date) ---
 merged = pd.merge(epa, nasa, on='Date', how='inner', suffixes=('_EPA', '_NASA'))
 print(f"Merged EPA+NASA: rows={len(merged)} cols={merged.columns.tolist()}")
 
-# add Year for landcover merging
-merged['Year'] = merged['Date'].dt.year
-
 # --- try to find a landcover timeseries CSV (annual) ---
 land_candidates = [
     "landcover_timeseries.csv",
@@ -78,18 +81,24 @@ if landcover is not None:
         ycol = year_col_candidates[0]
         landcover = landcover.rename(columns={ycol: 'Year'})
 
-    # ensure Year is integer
-    landcover['Year'] = pd.to_numeric(landcover['Year'], errors='coerce').astype('Int64')
-    # Merge by Year (left join keeps monthly rows)
-    merged = pd.merge(merged, landcover, on='Year', how='left', suffixes=('','_LC'))
+    # annual -> monthly alignment via merge_asof: one O(n+m) pass over the
+    # sorted Date arrays instead of a hash join on a Year column
+    landcover = landcover.copy()
+    years_lc = pd.to_numeric(landcover['Year'], errors='coerce')
+    landcover['Date'] = pd.to_datetime(years_lc, format='%Y', errors='coerce')
+    # drop on the built Date itself — merge_asof rejects null keys, and a
+    # float NaN year can slip past an Arrow-backed notna() mask
+    landcover = landcover.dropna(subset=['Date']).drop(columns=['Year']).sort_values('Date')
+    merged = merged.sort_values('Date')
+    merged = pd.merge_asof(merged, landcover, on='Date', direction='backward', suffixes=('', '_LC'))
     print(f"Merged with landcover ({land_fn}): rows={len(merged)} columns now: {merged.columns.tolist()}")
 else:
     print("No landcover file found. Looked for:", land_candidates)
     print("Proceeding without landcover. You can supply a yearly CSV later and re-run merge.")
 
 # --- diagnostics & export ---
-out_fn = "Merged_Dataset.csv"
-merged.to_csv(out_fn, index=False)
+out_fn = "Merged_Dataset.parquet"
+merged.to_parquet(out_fn, engine='pyarrow', compression='zstd', index=False)
 print(f"\nSaved merged dataset -> {out_fn} (rows: {len(merged)})")
 
 # Print head and missing value summary
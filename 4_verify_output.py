@@ -2,39 +2,38 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 
-# Load merged dataset
-df = pd.read_csv("Merged_Dataset.csv", parse_dates=["Date"])
+# Load merged dataset (Parquet keeps Date as datetime, no parse_dates needed)
+df = pd.read_parquet("Merged_Dataset.parquet")
 print("\nBasic Info:")
 print(df.info())
 print("\nSummary Stats:")
 print(df.describe())
 
 # --- Plot Time Series ---
-plt.figure(figsize=(10,5))
-plt.plot(df["Date"], df["O3_ug_m3"], label="Ozone (µg/m³)")
-plt.title("Monthly Average Ozone Concentration (EPA)")
-plt.xlabel("Year")
-plt.ylabel("O3 (µg/m³)")
-plt.grid(True)
-plt.legend()
-plt.show()
+# one figure with three stacked subplots: single backend init/render instead
+# of three, with a shared x-axis
+fig, axes = plt.subplots(3, 1, figsize=(10, 12), sharex=True)
 
-plt.figure(figsize=(10,5))
-plt.plot(df["Date"], df["T2M"], color='orange', label="Temperature (°C)")
-plt.title("Monthly Mean Temperature (NASA POWER)")
-plt.xlabel("Year")
-plt.ylabel("Temperature (°C)")
-plt.grid(True)
-plt.legend()
-plt.show()
+axes[0].plot(df["Date"], df["O3_ug_m3"], label="Ozone (µg/m³)")
+axes[0].set_title("Monthly Average Ozone Concentration (EPA)")
+axes[0].set_ylabel("O3 (µg/m³)")
+axes[0].grid(True)
+axes[0].legend()
+
+axes[1].plot(df["Date"], df["T2M"], color='orange', label="Temperature (°C)")
+axes[1].set_title("Monthly Mean Temperature (NASA POWER)")
+axes[1].set_ylabel("Temperature (°C)")
+axes[1].grid(True)
+axes[1].legend()
+
+axes[2].plot(df["Date"], df["PRECTOTCORR"], color='blue', label="Precipitation (mm/month)")
+axes[2].set_title("Monthly Total Precipitation (NASA POWER)")
+axes[2].set_xlabel("Year")
+axes[2].set_ylabel("Precipitation (mm)")
+axes[2].grid(True)
+axes[2].legend()
 
-plt.figure(figsize=(10,5))
-plt.plot(df["Date"], df["PRECTOTCORR"], color='blue', label="Precipitation (mm/month)")
-plt.title("Monthly Total Precipitation (NASA POWER)")
-plt.xlabel("Year")
-plt.ylabel("Precipitation (mm)")
-plt.grid(True)
-plt.legend()
+fig.tight_layout()
 plt.show()
 
 # --- Correlation Matrix ---
@@ -4,13 +4,14 @@ Exploratory Data Analysis of merged O3, temperature, and precipitation data.
 Generates visual insights and summary statistics.
 """
 
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy.stats import linregress
 
-# Load dataset
-df = pd.read_csv("Merged_Dataset.csv", parse_dates=["Date"])
+# Load dataset (Parquet keeps Date as datetime, no parse_dates needed)
+df = pd.read_parquet("Merged_Dataset.parquet")
 df = df.sort_values("Date").reset_index(drop=True)
 
 print("\n✅ Loaded dataset with", len(df), "records from", df['Date'].min().date(), "to", df['Date'].max().date())
@@ -18,34 +19,30 @@ print("\nColumns:", df.columns.tolist())
 print("\nSummary Statistics:\n", df.describe().round(2))
 
 # --- 1️⃣ Time Series Trends ---
-plt.figure(figsize=(10, 5))
-plt.plot(df["Date"], df["O3_ug_m3"], color="purple", linewidth=2, label="O₃ (µg/m³)")
-plt.title("Monthly O₃ Concentration (2010–2019)")
-plt.xlabel("Year")
-plt.ylabel("O₃ (µg/m³)")
-plt.grid(True, linestyle="--", alpha=0.6)
-plt.legend()
-plt.tight_layout()
-plt.show()
+# one figure, three stacked subplots sharing the x-axis: a single render pass
+# instead of three figure setups/teardowns
+fig, axes = plt.subplots(3, 1, figsize=(10, 12), sharex=True)
 
-plt.figure(figsize=(10, 5))
-plt.plot(df["Date"], df["T2M"], color="orange", linewidth=2, label="Temperature (°C)")
-plt.title("Monthly Mean Temperature (2010–2019)")
-plt.xlabel("Year")
-plt.ylabel("Temperature (°C)")
-plt.grid(True, linestyle="--", alpha=0.6)
-plt.legend()
-plt.tight_layout()
-plt.show()
+axes[0].plot(df["Date"], df["O3_ug_m3"], color="purple", linewidth=2, label="O₃ (µg/m³)")
+axes[0].set_title("Monthly O₃ Concentration (2010–2019)")
+axes[0].set_ylabel("O₃ (µg/m³)")
+axes[0].grid(True, linestyle="--", alpha=0.6)
+axes[0].legend()
 
-plt.figure(figsize=(10, 5))
-plt.plot(df["Date"], df["PRECTOTCORR"], color="blue", linewidth=2, label="Precipitation (mm/month)")
-plt.title("Monthly Precipitation (2010–2019)")
-plt.xlabel("Year")
-plt.ylabel("Precipitation (mm/month)")
-plt.grid(True, linestyle="--", alpha=0.6)
-plt.legend()
-plt.tight_layout()
+axes[1].plot(df["Date"], df["T2M"], color="orange", linewidth=2, label="Temperature (°C)")
+axes[1].set_title("Monthly Mean Temperature (2010–2019)")
+axes[1].set_ylabel("Temperature (°C)")
+axes[1].grid(True, linestyle="--", alpha=0.6)
+axes[1].legend()
+
+axes[2].plot(df["Date"], df["PRECTOTCORR"], color="blue", linewidth=2, label="Precipitation (mm/month)")
+axes[2].set_title("Monthly Precipitation (2010–2019)")
+axes[2].set_xlabel("Year")
+axes[2].set_ylabel("Precipitation (mm/month)")
+axes[2].grid(True, linestyle="--", alpha=0.6)
+axes[2].legend()
+
+fig.tight_layout()
 plt.show()
 
 # --- 2️⃣ Seasonal Patterns ---
@@ -90,13 +87,16 @@ plt.tight_layout()
 plt.show()
 
 # --- 5️⃣ Linear Trend Over Time (O₃) ---
-x = df.index
-y = df["O3_ug_m3"]
+# plain ndarrays: scipy skips the pandas->array conversion and the trend line
+# is computed without allocating an index-aligned Series
+x = np.arange(len(df), dtype=np.float64)
+y = df["O3_ug_m3"].to_numpy(dtype=np.float64)
 slope, intercept, r_value, p_value, std_err = linregress(x, y)
+trend = intercept + slope * x
 
 plt.figure(figsize=(10, 5))
 plt.plot(df["Date"], df["O3_ug_m3"], label="O₃ (µg/m³)", color="purple")
-plt.plot(df["Date"], intercept + slope*x, color="black", linestyle="--", label=f"Trend line (R²={r_value**2:.2f})")
+plt.plot(df["Date"].to_numpy(), trend, color="black", linestyle="--", label=f"Trend line (R²={r_value**2:.2f})")
 plt.title("Trend in O₃ Concentration (2010–2019)")
 plt.xlabel("Year")
 plt.ylabel("O₃ (µg/m³)")
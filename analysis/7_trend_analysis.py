@@ -243,10 +243,11 @@ def run_trend_analysis(
             "plot": plot_rel,
         })
 
-    # Write CSV summary
+    # Write CSV summary (plus a Parquet sibling — much cheaper for notebooks to re-read)
     summary_df = pd.DataFrame(summary_rows).sort_values(["location"]).reset_index(drop=True)
     summary_csv = out_root / "trend_summary.csv"
     summary_df.to_csv(summary_csv, index=False)
+    summary_df.to_parquet(out_root / "trend_summary.parquet", index=False)
 
     # Metadata JSON
     meta = {
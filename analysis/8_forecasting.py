@@ -361,10 +361,11 @@ def main():
             row.update(eval_results)
         summary_rows.append(row)
 
-    # Save summary CSV and JSON
+    # Save summary CSV and JSON (plus a Parquet sibling for faster notebook reads)
     summary_df = pd.DataFrame(summary_rows)
     summary_csv = out_root / "forecast_summary.csv"
     summary_df.to_csv(summary_csv, index=False)
+    summary_df.to_parquet(out_root / "forecast_summary.parquet", index=False)
     with open(out_root / "forecast_run_metadata.json", "w", encoding="utf-8") as fh:
         json.dump({"input": str(input_path), "engine": args.engine, "target_col": args.target_col, "n_locations": len(summary_rows)}, fh, indent=2)
     log.info("Saved forecast summary: %s", summary_csv)
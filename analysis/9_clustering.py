@@ -34,12 +34,60 @@ from typing import List, Optional, Dict
 
 import numpy as np
 import pandas as pd
-
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Optional Intel oneDAL acceleration: patch_sklearn() swaps in vectorized
+# kernels for KMeans/PCA and must run before the sklearn imports below.
+try:
+    from sklearnex import patch_sklearn
+    patch_sklearn()
+    _HAVE_SKLEARNEX = True
+except ImportError:
+    _HAVE_SKLEARNEX = False
+
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
 import joblib
 import datetime
+from collections import namedtuple
+
+# Lightweight stand-in for sklearn's PCA model: just the fitted projection.
+# Persisted as a plain dict of its fields (see run_clustering) so joblib.load
+# works from any process without importing this script for the class.
+PCAResult = namedtuple("PCAResult", ["components", "explained_variance", "n_components"])
+
+# orjson when available: much faster serialization, handles datetime natively,
+# and returns bytes ready for write_bytes; stdlib json otherwise
+try:
+    import orjson
+
+    def _dump_json(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _dump_json(obj) -> bytes:
+        return json.dumps(obj, indent=2, default=str).encode()
+
+# Optional numba kernel fusing standardize + project into one pass over X
+# (three bandwidth-bound array traversals become one); plain numpy otherwise.
+try:
+    from numba import njit, prange
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _scale_and_project(X, mean, std, V):
+        n, d = X.shape
+        k = V.shape[1]
+        out = np.empty((n, k), dtype=X.dtype)
+        for i in prange(n):
+            for j in range(k):
+                s = 0.0
+                for c in range(d):
+                    s += ((X[i, c] - mean[c]) / std[c]) * V[c, j]
+                out[i, j] = s
+        return out
+except ImportError:
+    _scale_and_project = None
 
 # -------------------- Logging --------------------
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s - %(message)s")
@@ -56,24 +104,75 @@ def parse_list_arg(s: Optional[str]) -> Optional[List[str]]:
 def ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
-def read_features(path: Path) -> pd.DataFrame:
+def dump_model(obj, path: Path) -> None:
+    """joblib.dump with fast lz4 compression and pickle protocol 5.
+
+    Falls back to zlib when the lz4 package is not installed.
+    """
+    try:
+        joblib.dump(obj, path, compress=("lz4", 3), protocol=5)
+    except Exception:
+        joblib.dump(obj, path, compress=3, protocol=5)
+
+def read_features(path: Path, columns: Optional[List[str]] = None) -> pa.Table:
+    """Read the features Parquet as an Arrow table, optionally pruned to `columns`.
+
+    Staying in Arrow until after aggregation skips the pandas block-manager
+    round-trip for the raw rows; only the small per-location matrix crosses
+    the Arrow->pandas bridge.
+    """
     log.info(f"Loading input: {path}")
     if not path.exists():
         raise FileNotFoundError(f"Input file not found: {path}")
-    df = pd.read_parquet(path)
-    log.info(f"Loaded dataframe with columns: {list(df.columns)}")
-    return df
-
-def pick_columns_case_insensitive(df: pd.DataFrame, col_name: str) -> Optional[str]:
-    """Return actual column in df that matches col_name case-insensitively, or None."""
-    if col_name in df.columns:
-        return col_name
-    lower_map = {c.lower(): c for c in df.columns}
+    cols = None
+    if columns:
+        # resolve requested names case-insensitively against the file schema
+        lower_map = {c.lower(): c for c in pq.read_schema(path).names}
+        cols = [lower_map[c.lower()] for c in columns if c and c.lower() in lower_map]
+        # dedupe (order-preserving): --pca-cols typically repeats --value-col,
+        # and a duplicate column makes Arrow's group_by fail on the ambiguous
+        # field reference
+        cols = list(dict.fromkeys(cols)) or None
+    tbl = pq.read_table(path, columns=cols)
+    log.info(f"Loaded table with columns: {tbl.column_names}")
+    return tbl
+
+def pick_columns_case_insensitive(lower_map: Dict[str, str], col_name: str) -> Optional[str]:
+    """Return the actual column matching col_name case-insensitively, or None.
+
+    Takes a prebuilt {lowercased: actual} map so callers build it once per
+    frame instead of once per lookup.
+    """
     return lower_map.get(col_name.lower())
 
 # -------------------- Main functionality --------------------
+def _grouped_mean(df: pd.DataFrame, group_by: str, cols: List[str]) -> pd.DataFrame:
+    """Per-group mean of `cols` via factorize + sort + reduceat.
+
+    One stable sort and two linear passes per column instead of pandas
+    groupby's per-group dispatch — noticeably faster on large inputs.
+    """
+    codes, uniques = pd.factorize(df[group_by].values, sort=False)
+    if len(uniques) == 0:
+        return pd.DataFrame(columns=[group_by] + list(cols))
+    # drop NaN groups (factorize codes them as -1), matching groupby semantics
+    valid = np.flatnonzero(codes >= 0)
+    order = valid[np.argsort(codes[valid], kind="stable")]
+    starts = np.searchsorted(codes[order], np.arange(len(uniques)))
+    out = {group_by: uniques}
+    for col in cols:
+        vals = df[col].to_numpy(dtype=np.float64)[order]
+        # skip NaN like groupby().mean(): zero-fill for the sum and divide by
+        # the per-group non-NaN count (an all-NaN group yields NaN via 0/0)
+        ok = ~np.isnan(vals)
+        sums = np.add.reduceat(np.where(ok, vals, 0.0), starts)
+        cnts = np.add.reduceat(ok.astype(np.float64), starts)
+        with np.errstate(invalid="ignore"):
+            out[col] = sums / cnts
+    return pd.DataFrame(out)
+
 def prepare_feature_matrix(
-    df: pd.DataFrame,
+    df,
     value_col: str,
     date_col: str,
     location_col: str,
@@ -83,48 +182,62 @@ def prepare_feature_matrix(
     Prepare the per-location feature matrix for clustering.
     By default, we will aggregate to one row per location using last available values
     of the requested columns (or mean if multiple).
+    Accepts either a pyarrow Table (preferred: aggregation stays Arrow-native)
+    or a pandas DataFrame.
     """
-    # normalize column names using case-insensitive match
+    is_table = isinstance(df, pa.Table)
+    # normalize column names using case-insensitive match; build the lookup
+    # map once for all resolutions below
+    names = df.column_names if is_table else list(df.columns)
+    lower_map = {c.lower(): c for c in names}
     used_cols = {}
     for key in (value_col, date_col, location_col):
         if key is None:
             continue
-        actual = pick_columns_case_insensitive(df, key)
+        actual = pick_columns_case_insensitive(lower_map, key)
         if actual is None:
-            raise ValueError(f"Column '{key}' not found in dataframe. Available: {list(df.columns)}")
+            raise ValueError(f"Column '{key}' not found in dataframe. Available: {names}")
         used_cols[key] = actual
 
     # If pca_cols provided, ensure they exist (case-insensitive)
     actual_pca_cols = []
     if pca_cols:
         for c in pca_cols:
-            actual = pick_columns_case_insensitive(df, c)
+            actual = pick_columns_case_insensitive(lower_map, c)
             if actual is None:
                 log.warning(f"PCA column '{c}' not found in dataframe; skipping it.")
             else:
                 actual_pca_cols.append(actual)
 
-    # Ensure date is datetime
-    if used_cols.get(date_col) is not None:
-        df[used_cols[date_col]] = pd.to_datetime(df[used_cols[date_col]], errors="coerce")
+    # No date parsing here: date_col is validated but never read by the
+    # aggregation below, so the per-string to_datetime pass was pure waste.
 
     # If we have PCA columns, use those aggregated per-location.
     # Otherwise, fallback to using provided value_col (one numeric per location).
     group_by = used_cols[location_col]
     if actual_pca_cols:
         # Aggregate by mean per location for each selected pca col
-        agg_df = df.groupby(group_by)[actual_pca_cols].mean().reset_index()
+        if is_table:
+            agg = df.group_by(group_by).aggregate([(c, "mean") for c in actual_pca_cols])
+            agg_df = agg.to_pandas().rename(columns={f"{c}_mean": c for c in actual_pca_cols})
+        else:
+            agg_df = _grouped_mean(df, group_by, actual_pca_cols)
         log.info(f"Prepared matrix using PCA columns: {actual_pca_cols}. Shape: {agg_df.shape}")
         return agg_df.set_index(group_by)
     else:
         # Use the single value_col: aggregate mean per location
         actual_value_col = used_cols[value_col]
-        agg_df = df.groupby(group_by)[actual_value_col].mean().reset_index()
+        if is_table:
+            agg = df.group_by(group_by).aggregate([(actual_value_col, "mean")])
+            agg_df = agg.to_pandas().rename(columns={f"{actual_value_col}_mean": actual_value_col})
+        else:
+            agg_df = _grouped_mean(df, group_by, [actual_value_col])
         agg_df = agg_df.rename(columns={actual_value_col: "value"})
         log.info(f"Prepared matrix using value column '{actual_value_col}'. Shape: {agg_df.shape}")
         return agg_df.set_index(group_by)
 
-def safe_pca_transform(X: np.ndarray, requested_n: Optional[int], random_state: int = 0):
+def safe_pca_transform(X: np.ndarray, requested_n: Optional[int], random_state: int = 0,
+                       compute_transform: bool = True):
     """
     Perform PCA safely:
      - compute max_allowed = min(n_samples, n_features)
@@ -145,8 +258,17 @@ def safe_pca_transform(X: np.ndarray, requested_n: Optional[int], random_state:
         log.info("PCA skipped: requested components equal number of features (no reduction).")
         return X, None, n_features
     log.info(f"Running PCA with n_components={pca_n} (requested={requested_n}, max_allowed={max_allowed})")
-    pca = PCA(n_components=pca_n, random_state=random_state)
-    X_pca = pca.fit_transform(X)
+    # X is already standardized (zero mean), so the covariance is one BLAS
+    # matmul; eigh on the tiny n_features x n_features matrix is far cheaper
+    # than a full SVD of X when n_samples >> n_features.
+    C = X.T @ X / max(n_samples - 1, 1)
+    w, V = np.linalg.eigh(C)                 # eigenvalues ascending
+    components = V[:, -pca_n:][:, ::-1]      # top-pca_n eigenvectors, descending
+    pca = PCAResult(components=components,
+                    explained_variance=w[-pca_n:][::-1],
+                    n_components=pca_n)
+    # caller may project with the fused numba kernel instead
+    X_pca = X @ components if compute_transform else None
     return X_pca, pca, pca_n
 
 def run_clustering(
@@ -159,8 +281,11 @@ def run_clustering(
     pca_n: Optional[int],
     k: int,
     random_state: int = 0,
+    backend: str = "sklearn",
 ) -> Dict:
-    df = read_features(input_path)
+    # read only the columns the matrix needs; aggregation happens Arrow-side
+    wanted = [c for c in [location_col, date_col, value_col, *(pca_cols or [])] if c]
+    df = read_features(input_path, columns=wanted)
 
     # Prepare matrix (index = location)
     matrix_df = prepare_feature_matrix(df, value_col, date_col, location_col, pca_cols=pca_cols)
@@ -174,27 +299,48 @@ def run_clustering(
             "input": str(input_path),
             "n_locations": n_locations,
             "status": "skipped_not_enough_locations",
-            "timestamp": datetime.datetime.utcnow().isoformat(),
+            "timestamp": datetime.datetime.utcnow(),
         }
         # ensure outputs directory exists and write metadata
         ensure_dir(out_root)
-        (out_root / "clustering_metadata.json").write_text(json.dumps(meta, indent=2))
+        (out_root / "clustering_metadata.json").write_bytes(_dump_json(meta))
         return meta
 
     # Build feature matrix X (rows=locations, cols=features)
-    X_raw = matrix_df.values.astype(float)  # may raise if non-numeric; that's reasonable
+    # float32: half the memory traffic, and sklearn's distance kernels have
+    # fp32 paths — plenty of precision for clustering. to_numpy(dtype=...) takes
+    # the typed C conversion path (raising on non-numeric; that's reasonable),
+    # and ascontiguousarray guarantees the C layout BLAS wants. The default
+    # copy keeps X_raw writable and detached from the frame's buffers — under
+    # pandas copy-on-write, copy=False can hand back a read-only view that the
+    # in-place StandardScaler path below must not touch.
+    X_raw = np.ascontiguousarray(matrix_df.to_numpy(dtype=np.float32))
     loc_index = matrix_df.index.astype(str).tolist()
 
-    # Standardize
-    scaler = StandardScaler()
+    # Standardize + project. With the numba kernel available, keep X_raw
+    # pristine (copy=True), fit on the scaled copy, then build the clustering
+    # matrix in a single fused (X - mean) / std @ V traversal of X_raw.
+    # Otherwise scale in place (copy=False: no second float32 matrix).
+    fuse = _scale_and_project is not None
+    scaler = StandardScaler(copy=fuse)
     X_scaled = scaler.fit_transform(X_raw)
     log.info(f"Standardized features (shape={X_scaled.shape}).")
 
     # Safe PCA
-    X_transformed, pca_model, pca_n_used = safe_pca_transform(X_scaled, pca_n, random_state=random_state)
+    X_transformed, pca_model, pca_n_used = safe_pca_transform(
+        X_scaled, pca_n, random_state=random_state, compute_transform=not fuse)
 
     # Choose data to cluster
-    X_for_clustering = X_transformed if pca_model is not None else X_scaled
+    if pca_model is None:
+        X_for_clustering = X_scaled
+    elif fuse:
+        X_for_clustering = _scale_and_project(
+            X_raw,
+            scaler.mean_.astype(X_raw.dtype),
+            scaler.scale_.astype(X_raw.dtype),
+            pca_model.components.astype(X_raw.dtype))
+    else:
+        X_for_clustering = X_transformed
 
     # Safety: ensure k is not larger than number of samples - 1
     max_k = max(1, n_locations - 1)
@@ -203,22 +349,36 @@ def run_clustering(
         k = max_k
 
     # Run clustering
-    log.info(f"Running KMeans with k={k}")
-    km = KMeans(n_clusters=k, random_state=random_state, n_init=10)
+    if backend == "sklearnex" and not _HAVE_SKLEARNEX:
+        log.warning("Backend 'sklearnex' requested but sklearnex is not installed; using stock sklearn.")
+    if backend == "minibatch":
+        log.info(f"Running MiniBatchKMeans with k={k}")
+        km = MiniBatchKMeans(n_clusters=k, random_state=random_state, n_init=5, batch_size=1024)
+    else:
+        log.info(f"Running KMeans with k={k}" + (" (sklearnex-patched)" if _HAVE_SKLEARNEX else ""))
+        km = KMeans(n_clusters=k, random_state=random_state, n_init=10)
     labels = km.fit_predict(X_for_clustering)
 
     # Prepare outputs
     ensure_dir(out_root)
+    # pyarrow's multithreaded C++ CSV writer, plus a compact Parquet copy for
+    # downstream readers
     clusters_df = pd.DataFrame({"location": loc_index, "cluster": labels})
+    clusters_tbl = pa.Table.from_pandas(clusters_df, preserve_index=False)
     clusters_csv = out_root / "clusters_by_location.csv"
-    clusters_df.to_csv(clusters_csv, index=False)
-    log.info(f"Wrote cluster assignments: {clusters_csv}")
+    pacsv.write_csv(clusters_tbl, clusters_csv)
+    clusters_parquet = out_root / "clusters_by_location.parquet"
+    pq.write_table(clusters_tbl, clusters_parquet, compression="zstd")
+    log.info(f"Wrote cluster assignments: {clusters_csv} (+ parquet)")
 
     # Summary
     summary = clusters_df.groupby("cluster").size().reset_index(name="n_locations")
+    summary_tbl = pa.Table.from_pandas(summary, preserve_index=False)
     summary_csv = out_root / "cluster_summary.csv"
-    summary.to_csv(summary_csv, index=False)
-    log.info(f"Wrote cluster summary: {summary_csv}")
+    pacsv.write_csv(summary_tbl, summary_csv)
+    summary_parquet = out_root / "cluster_summary.parquet"
+    pq.write_table(summary_tbl, summary_parquet, compression="zstd")
+    log.info(f"Wrote cluster summary: {summary_csv} (+ parquet)")
 
     # Save PCA and scaler if used
     if pca_model is not None:
@@ -226,19 +386,21 @@ def run_clustering(
         ensure_dir(models_dir)
         pca_path = models_dir / "pca_model.joblib"
         scaler_path = models_dir / "scaler.joblib"
-        joblib.dump(pca_model, pca_path)
-        joblib.dump(scaler, scaler_path)
+        # dump a plain dict: the namedtuple class lives in __main__ here, so
+        # pickling it directly would make the file unloadable elsewhere
+        dump_model(pca_model._asdict(), pca_path)
+        dump_model(scaler, scaler_path)
         log.info(f"Wrote PCA model and scaler to {models_dir}")
     else:
         pca_path = None
         scaler_path = out_root / "scaler.joblib"
-        joblib.dump(scaler, scaler_path)
+        dump_model(scaler, scaler_path)
         log.info(f"Wrote scaler to {scaler_path}")
 
     # Save KMeans model
     km_path = out_root / "models" / "kmeans_model.joblib"
     ensure_dir(km_path.parent)
-    joblib.dump(km, km_path)
+    dump_model(km, km_path)
     log.info(f"Wrote KMeans model: {km_path}")
 
     # Metadata
@@ -252,14 +414,18 @@ def run_clustering(
         "pca_requested_n": pca_n,
         "pca_n_used": int(pca_n_used) if pca_n_used is not None else None,
         "k": int(k),
+        "backend": backend,
+        "sklearnex_active": _HAVE_SKLEARNEX,
         "outputs": {
             "clusters_csv": str(clusters_csv),
+            "clusters_parquet": str(clusters_parquet),
             "cluster_summary_csv": str(summary_csv),
+            "cluster_summary_parquet": str(summary_parquet),
             "models_dir": str((out_root / "models").resolve()),
         },
-        "timestamp": datetime.datetime.utcnow().isoformat(),
+        "timestamp": datetime.datetime.utcnow(),
     }
-    (out_root / "clustering_metadata.json").write_text(json.dumps(metadata, indent=2))
+    (out_root / "clustering_metadata.json").write_bytes(_dump_json(metadata))
     log.info("Clustering completed.")
 
     return metadata
@@ -275,6 +441,8 @@ def build_argparser() -> argparse.ArgumentParser:
     p.add_argument("--pca-cols", default=None, help="Comma-separated list of columns to use for PCA (overrides --value-col).")
     p.add_argument("--pca-n", type=int, default=None, help="Requested number of PCA components (auto-limited).")
     p.add_argument("--k", type=int, default=4, help="Number of clusters for KMeans.")
+    p.add_argument("--backend", choices=["sklearn", "sklearnex", "minibatch"], default="sklearn",
+                   help="Clustering backend: stock KMeans, oneDAL-patched KMeans, or MiniBatchKMeans.")
     p.add_argument("--random-state", type=int, default=0, help="Random seed.")
     return p
 
@@ -298,8 +466,9 @@ def main():
             pca_n=args.pca_n,
             k=args.k,
             random_state=args.random_state,
+            backend=args.backend,
         )
-        log.info(json.dumps(meta, indent=2))
+        log.info(_dump_json(meta).decode())
     except Exception as e:
         log.exception("Clustering run failed.")
         raise
@@ -7,8 +7,11 @@ url = ("https://power.larc.nasa.gov/api/temporal/daily/point?"
        "parameters=T2M,PRECTOTCORR&community=AG&longitude=-80.8&latitude=35.23"
        "&start=20100101&end=20191231&format=CSV")
 
-# Fetch data
-response = requests.get(url)
-with open("NASA_POWER_Garinger_2010_2019.csv", "wb") as f:
-    f.write(response.content)
+# Fetch data — stream straight to disk in 64 KB chunks instead of buffering
+# the whole response body in memory
+with requests.get(url, stream=True) as response:
+    response.raise_for_status()
+    with open("NASA_POWER_Garinger_2010_2019.csv", "wb") as f:
+        for chunk in response.iter_content(chunk_size=65536):
+            f.write(chunk)
 
@@ -10,6 +10,7 @@ transform and write partitioned parquet output to data_lake/epa_o3_parquet.
 - Prints helpful diagnostics for HADOOP_HOME / winutils on Windows
 """
 
+import csv
 import os
 from pathlib import Path
 import sys
@@ -18,6 +19,7 @@ from typing import Optional, List
 from pyspark.sql import SparkSession
 from pyspark.sql import functions as F
 from pyspark.sql import DataFrame
+from pyspark.sql.types import StructType, StructField, StringType, DoubleType, DateType
 
 
 # ---------- CONFIG ----------
@@ -66,6 +68,40 @@ def normalize_column_names(df: DataFrame) -> DataFrame:
             df = df.withColumnRenamed(oc, nc)
     return df
 
+def build_csv_schema(path: Path) -> Optional[StructType]:
+    """Build an explicit StructType from the CSV header (one cheap line read).
+
+    Passing a schema lets Spark read the file in a single pass instead of the
+    extra full inferSchema scan. Date-like columns become DateType, known
+    measurement columns (o3/ozone) become double, and everything else stays
+    string — under PERMISSIVE mode a wrongly-typed double column would
+    silently null out free-text values, so unknown columns must not be
+    guessed numeric. The to_date/casts downstream handle strings fine.
+    """
+    try:
+        with open(path, "r", newline="", encoding="utf-8-sig") as fh:
+            header = next(csv.reader(fh))
+    except Exception:
+        return None
+    fields = []
+    for name in header:
+        nc = name.strip().lower()
+        if nc in ("date", "dt", "measurement_date", "measurement_date_utc"):
+            dtype = DateType()
+        elif any(k in nc for k in ("o3", "ozone")) and "name" not in nc and "desc" not in nc and "unit" not in nc:
+            dtype = DoubleType()
+        else:
+            dtype = StringType()
+        fields.append(StructField(name.strip(), dtype, True))
+    return StructType(fields)
+
+def read_csv_with_schema(spark: SparkSession, path: Path) -> DataFrame:
+    """Read a CSV with an explicit schema, falling back to inferSchema."""
+    schema = build_csv_schema(path)
+    if schema is not None:
+        return spark.read.schema(schema).option("header", True).csv(str(path))
+    return spark.read.option("header", True).option("inferSchema", True).csv(str(path))
+
 def read_cleaned_csv(spark: SparkSession, explicit_path: Optional[Path]) -> DataFrame:
     """Read the cleaned CSV. Use explicit_path if provided else auto-discover."""
     # explicit path first
@@ -73,7 +109,7 @@ def read_cleaned_csv(spark: SparkSession, explicit_path: Optional[Path]) -> Data
         p = Path(explicit_path)
         if p.exists():
             pretty_print(f"📁 Reading cleaned CSV from explicit path: {p}")
-            df = spark.read.option("header", True).option("inferSchema", True).csv(str(p))
+            df = read_csv_with_schema(spark, p)
             return normalize_column_names(df)
         else:
             raise FileNotFoundError(f"Cleaned CSV not found: {p}")
@@ -88,7 +124,7 @@ def read_cleaned_csv(spark: SparkSession, explicit_path: Optional[Path]) -> Data
             pretty_print("   " + str(c))
     chosen = candidates[0]
     pretty_print(f"📁 Using discovered CSV: {chosen}")
-    df = spark.read.option("header", True).option("inferSchema", True).csv(str(chosen))
+    df = read_csv_with_schema(spark, chosen)
     return normalize_column_names(df)
 
 
@@ -175,9 +211,17 @@ def main():
         # remove duplicates
         partition_by = list(dict.fromkeys(partition_by))
         pretty_print(f"Partitioning by: {partition_by}")
+        # sort rows inside each partition before writing: runs of equal/ordered
+        # values compress far better and enable predicate pushdown downstream
+        sort_cols = [c for c in ("site_id", "date") if c in df_out.columns]
+        if sort_cols:
+            df_out = df_out.sortWithinPartitions(*sort_cols)
         (df_out.write
             .mode("overwrite")
             .partitionBy(*partition_by)
+            .option("compression", "zstd")
+            .option("parquet.enable.dictionary", "true")
+            .option("parquet.block.size", str(128 * 1024 * 1024))
             .parquet(write_path))
         pretty_print("✅ EPA parquet saved -> " + write_path)
     except Exception as e:
@@ -16,11 +16,14 @@ Usage:
 
 import os
 import glob
+import re
+from concurrent.futures import ThreadPoolExecutor
 import rasterio
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from rasterio.warp import transform
+from rasterio.windows import Window
 
 # --- USER SETTINGS ---
 DATA_FOLDER = "MODIS_LandCover"   # folder with all your MCD12Q1 .hdf files
@@ -57,6 +60,14 @@ IGBP = {
     255: "Fill Value"
 }
 
+# year pattern in MCD12Q1 filenames (A2019001 etc.), compiled once at import
+_YEAR_RE = re.compile(r"A(\d{4})")
+
+# LC_Type1 is uint8, so a 256-entry LUT covers every possible value; one
+# gather replaces the per-call set build + O(N*K) scan of np.isin
+_VALID_LUT = np.zeros(256, dtype=bool)
+_VALID_LUT[list(IGBP.keys())] = True
+
 def find_lc_subdataset(hdf_path):
     """Return the subdataset string for LC_Type1 (if exists) else None."""
     with rasterio.open(hdf_path) as hdf:
@@ -65,85 +76,117 @@ def find_lc_subdataset(hdf_path):
                 return s
     return None
 
-def sample_value_from_subdataset(subdataset, lon, lat, neighbourhood=1):
-    """Open the subdataset and sample value(s) at lon, lat (WGS84). Returns numeric value or mean."""
+def _pixel_index(src, lon, lat):
+    """Return (row, col) of lon/lat (WGS84) in an open dataset, with bounds check."""
+    # Convert lon/lat -> dataset CRS if needed
+    ds_crs = src.crs
+    if ds_crs is None:
+        # no CRS, assume lon/lat (rare)
+        x_src, y_src = lon, lat
+    else:
+        # transform from EPSG:4326 to dataset CRS
+        xs, ys = transform("EPSG:4326", ds_crs, [lon], [lat])
+        x_src, y_src = xs[0], ys[0]
+
+    # get raster indices (row, col)
+    try:
+        row, col = src.index(x_src, y_src)
+    except Exception as e:
+        raise RuntimeError(f"Failed to convert coordinates to pixel index: {e}")
+
+    # boundary check
+    if not (0 <= row < src.height and 0 <= col < src.width):
+        raise RuntimeError("Coordinate is outside the raster bounds.")
+    return row, col
+
+def locate_pixel(subdataset, lon, lat):
+    """Resolve the pixel index once; MCD12Q1 tiles share CRS/transform across years."""
+    with rasterio.open(subdataset) as src:
+        return _pixel_index(src, lon, lat)
+
+def sample_value_from_subdataset(subdataset, lon, lat, neighbourhood=1, rowcol=None):
+    """Open the subdataset and sample value(s) at lon, lat (WGS84). Returns numeric value or mean.
+
+    Pass a precomputed `rowcol` to skip the per-file CRS transform.
+    """
     with rasterio.open(subdataset) as src:
         # ensure there is at least one band
         if src.count < 1:
             raise RuntimeError(f"Subdataset has no bands: {subdataset}")
 
-        # Convert lon/lat -> dataset CRS if needed
-        ds_crs = src.crs
-        if ds_crs is None:
-            # no CRS, assume lon/lat (rare)
-            x_src, y_src = lon, lat
-        else:
-            # transform from EPSG:4326 to dataset CRS
-            xs, ys = transform("EPSG:4326", ds_crs, [lon], [lat])
-            x_src, y_src = xs[0], ys[0]
-
-        # get raster indices (row, col)
-        try:
-            row, col = src.index(x_src, y_src)
-        except Exception as e:
-            raise RuntimeError(f"Failed to convert coordinates to pixel index: {e}")
-
-        # boundary check
-        if not (0 <= row < src.height and 0 <= col < src.width):
-            raise RuntimeError("Coordinate is outside the raster bounds.")
-
-        arr = src.read(1)  # safe because src.count >= 1
+        row, col = rowcol if rowcol is not None else _pixel_index(src, lon, lat)
 
+        # windowed read: pull only the pixels we need instead of materializing
+        # the whole ~2400x2400 band for one sample
         if neighbourhood <= 1:
-            val = arr[row, col]
+            val = src.read(1, window=Window(col, row, 1, 1))[0, 0]
             return int(val)
         else:
             half = neighbourhood // 2
-            r0 = max(0, row - half)
-            r1 = min(src.height, row + half + 1)
-            c0 = max(0, col - half)
-            c1 = min(src.width, col + half + 1)
-            window = arr[r0:r1, c0:c1]
+            # clamp to the raster bounds: a boundless read would inject
+            # synthetic fill pixels (255 is itself a valid IGBP code) into
+            # the neighbourhood mean at tile edges
+            r0, c0 = max(row - half, 0), max(col - half, 0)
+            r1 = min(row + half + 1, src.height)
+            c1 = min(col + half + 1, src.width)
+            window = src.read(1, window=Window(c0, r0, c1 - c0, r1 - r0))
             # ignore fill values 255 and 254 as needed
-            valid = window[np.isin(window, list(IGBP.keys()), invert=False)]
+            valid = window[_VALID_LUT[window]]
             if valid.size == 0:
                 return int(np.nan)
             mean_val = np.round(np.nanmean(valid)).astype(int)
             return int(mean_val)
 
+def _process_file(f, lon, lat, neighbourhood=1, rowcol=None):
+    """Extract the landcover value for one .hdf file; returns a row dict or None."""
+    # infer year from filename if possible (looks for AYYYYxxx)
+    basename = os.path.basename(f)
+    year = None
+    # try patterns like A2019001 or .A2019...
+    m = _YEAR_RE.search(basename)
+    if m:
+        year = int(m.group(1))
+    else:
+        # fallback to file modified year
+        year = int(pd.to_datetime(os.path.getmtime(f), unit="s").year)
+
+    print(f"Processing {basename} -> year {year} ...")
+    lc_sub = find_lc_subdataset(f)
+    if lc_sub is None:
+        print("  WARNING: LC_Type1 subdataset not found — skipping file.")
+        return None
+
+    try:
+        val = sample_value_from_subdataset(lc_sub, lon, lat, neighbourhood=neighbourhood, rowcol=rowcol)
+    except Exception as e:
+        print(f"  ERROR reading {basename}: {e}")
+        val = np.nan
+
+    return {"Year": year, "File": basename, "LC_Code": val, "LC_Name": IGBP.get(int(val), "Unknown" if not np.isnan(val) else np.nan)}
+
 def extract_timeseries(data_folder, lon, lat, neighbourhood=1):
     pattern = os.path.join(data_folder, "*.hdf")
     files = sorted(glob.glob(pattern))
     if len(files) == 0:
         raise SystemExit(f"No .hdf files found in {data_folder}. Put your MCD12Q1 files there.")
 
-    rows = []
+    # the tile grid is identical across years, so resolve the pixel index once
+    # on the first readable file and reuse it for every year
+    rowcol = None
     for f in files:
-        # infer year from filename if possible (looks for AYYYYxxx)
-        basename = os.path.basename(f)
-        year = None
-        # try patterns like A2019001 or .A2019...
-        import re
-        m = re.search(r"A(\d{4})", basename)
-        if m:
-            year = int(m.group(1))
-        else:
-            # fallback to file modified year
-            year = int(pd.to_datetime(os.path.getmtime(f), unit="s").year)
-
-        print(f"Processing {basename} -> year {year} ...")
         lc_sub = find_lc_subdataset(f)
-        if lc_sub is None:
-            print("  WARNING: LC_Type1 subdataset not found — skipping file.")
-            continue
-
-        try:
-            val = sample_value_from_subdataset(lc_sub, lon, lat, neighbourhood=neighbourhood)
-        except Exception as e:
-            print(f"  ERROR reading {basename}: {e}")
-            val = np.nan
-
-        rows.append({"Year": year, "File": basename, "LC_Code": val, "LC_Name": IGBP.get(int(val), "Unknown" if not np.isnan(val) else np.nan)})
+        if lc_sub is not None:
+            try:
+                rowcol = locate_pixel(lc_sub, lon, lat)
+            except Exception as e:
+                print(f"  WARNING: could not precompute pixel index ({e}); falling back to per-file transform.")
+            break
+
+    # per-file reads are independent and I/O-bound (GDAL releases the GIL),
+    # so overlap them across threads; each worker opens its own handle
+    with ThreadPoolExecutor() as ex:
+        rows = list(ex.map(lambda f: _process_file(f, lon, lat, neighbourhood, rowcol=rowcol), files))
+    rows = [r for r in rows if r is not None]
 
     df = pd.DataFrame(rows).sort_values("Year").reset_index(drop=True)
     return df
@@ -155,8 +198,9 @@ def plot_timeseries(df, out_png):
     # plot LC code (discrete) and annotate class names
     plt.figure(figsize=(8,4))
     plt.plot(df["Year"], df["LC_Code"], marker="o", linestyle="-")
-    for i, r in df.iterrows():
-        plt.text(r["Year"], r["LC_Code"] + 0.2, str(r["LC_Code"]) + " - " + str(r["LC_Name"]), fontsize=9, ha="center")
+    # zip over plain arrays: no per-row Series construction like iterrows
+    for year, code, name in zip(df["Year"].values, df["LC_Code"].values, df["LC_Name"].values):
+        plt.text(year, code + 0.2, str(code) + " - " + str(name), fontsize=9, ha="center")
     plt.xlabel("Year")
     plt.ylabel("MODIS LC_Type1 Code")
     plt.title(f"Land Cover (LC_Type1) at ({LAT}, {LON})")
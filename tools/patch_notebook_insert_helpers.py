@@ -14,120 +14,260 @@ This script:
  - writes the modified notebook back to the same path.
 """
 import json
+import os
+import shutil
 import sys
 from pathlib import Path
 from datetime import datetime
 
-HELPER_CELL_SOURCE = [
-    "# Robust file-read helpers for the notebook\n",
-    "from pathlib import Path\n",
-    "import pandas as pd\n",
-    "import traceback\n",
-    "\n",
-    "def try_read_parquet(path):\n",
-    "    \"\"\"\n",
-    "    Return a DataFrame if parquet exists and is readable, otherwise None.\n",
-    "    \"\"\"\n",
-    "    p = Path(path)\n",
-    "    try:\n",
-    "        if p.exists():\n",
-    "            df = pd.read_parquet(p)\n",
-    "            return df\n",
-    "        return None\n",
-    "    except Exception as e:\n",
-    "        print(f\"⚠️ Failed to read parquet {p}: {e}\")\n",
-    "        traceback.print_exc(limit=1)\n",
-    "        return None\n",
-    "\n",
-    "def try_read_csv(path, parse_dates=None, nrows_preview=0):\n",
-    "    \"\"\"\n",
-    "    Read CSV if present. If parse_dates is given, inspect file columns first\n",
-    "    and only pass the parse_dates entries that actually exist (avoids ValueError).\n",
-    "    Returns DataFrame or None on missing file / failure.\n",
-    "    - path: Path or str\n",
-    "    - parse_dates: None or list/tuple/str of column(s) to parse as dates\n",
-    "    \"\"\"\n",
-    "    p = Path(path)\n",
-    "    try:\n",
-    "        if not p.exists():\n",
-    "            return None\n",
-    "\n",
-    "        # If parse_dates is provided, check which of those columns exist in the file\n",
-    "        cols_to_parse = None\n",
-    "        if parse_dates:\n",
-    "            # read only header to inspect column names (fast)\n",
-    "            preview = pd.read_csv(p, nrows=nrows_preview)\n",
-    "            available_cols = set(preview.columns.tolist())\n",
-    "            if isinstance(parse_dates, (list, tuple)):\n",
-    "                cols_to_parse = [c for c in parse_dates if c in available_cols]\n",
-    "            else:\n",
-    "                cols_to_parse = [parse_dates] if parse_dates in available_cols else []\n",
-    "        # actually read with guarded parse_dates\n",
-    "        if cols_to_parse:\n",
-    "            return pd.read_csv(p, parse_dates=cols_to_parse)\n",
-    "        else:\n",
-    "            # read without parse_dates to avoid ValueError\n",
-    "            return pd.read_csv(p)\n",
-    "    except Exception as e:\n",
-    "        print(f\"⚠️ Failed to read CSV {p}: {e}\")\n",
-    "        traceback.print_exc(limit=1)\n",
-    "        return None\n",
-]
-
-LOAD_CELL_SOURCE = [
-    "# Auto-detected paths and safe loading using the helpers above\n",
-    "from pathlib import Path\n",
-    "cwd = Path.cwd()\n",
-    "if (cwd / 'data_lake').exists():\n",
-    "    project_root = cwd\n",
-    "elif (cwd.parent / 'data_lake').exists():\n",
-    "    project_root = cwd.parent\n",
-    "else:\n",
-    "    # fallback: if PROJECT_ROOT variable already set in notebook use it\n",
-    "    try:\n",
-    "        project_root\n",
-    "    except NameError:\n",
-    "        project_root = cwd  # last resort: assume current working dir\n",
-    "    # we don't raise here to keep notebook non-fatal; prints follow\n",
-    "\n",
-    "print('Detected project root:', project_root)\n",
-    "\n",
-    "# default paths (adjust if your pipeline writes elsewhere)\n",
-    "features_path = project_root / 'data_lake/feature_sets/features.parquet'\n",
-    "trend_summary_path = project_root / 'analysis_outputs/trends/trend_summary.csv'\n",
-    "forecast_summary_path = project_root / 'analysis_outputs/forecasts/forecast_summary.csv'\n",
-    "\n",
-    "# Use the robust helpers\n",
-    "df_features = try_read_parquet(features_path)\n",
-    "trend_summary = try_read_csv(trend_summary_path, parse_dates=['date'])\n",
-    "forecast_summary = try_read_csv(forecast_summary_path, parse_dates=['date'])\n",
-    "\n",
-    "print('features:', 'found' if df_features is not None else 'missing')\n",
-    "print('trend_summary:', 'found' if trend_summary is not None else 'missing')\n",
-    "print('forecast_summary:', 'found' if forecast_summary is not None else 'missing')\n",
-    "\n",
-    "if df_features is not None:\n",
-    "    print('✅ features shape:', df_features.shape)\n",
-    "    print('Columns:', df_features.columns.tolist())\n",
-    "\n",
-    "# If a CSV was read without parse_dates but you want to parse later safely:\n",
-    "if trend_summary is not None and 'date' in trend_summary.columns and not pd.api.types.is_datetime64_any_dtype(trend_summary['date']):\n",
-    "    trend_summary['date'] = pd.to_datetime(trend_summary['date'], errors='coerce')\n",
-]
-
-def make_cell(source_lines, cell_type="code"):
+# orjson (C JSON) parses/serializes multi-MB notebooks several times faster
+# than stdlib json; fall back to the stdlib when it is not installed
+try:
+    import orjson
+
+    def _loads(data):
+        return orjson.loads(data)
+
+    def _dumps(obj) -> str:
+        # compact output: Jupyter reads it fine and it skips the per-token
+        # indentation work and the extra bytes on disk
+        return orjson.dumps(obj).decode()
+except ImportError:
+    def _loads(data):
+        return json.loads(data)
+
+    def _dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+HELPER_CELL_SOURCE = '''\
+# Robust file-read helpers for the notebook
+from pathlib import Path
+import functools
+import os
+import re
+import pandas as pd
+import pyarrow.parquet as pq
+import traceback
+
+@functools.lru_cache(maxsize=4)
+def detect_project_root(cwd_str):
+    """
+    Return the project root for cwd_str (the dir holding data_lake), or None
+    if it can't be detected. lru_cache keyed on the cwd string makes reruns
+    of the load cell a dict lookup instead of repeated directory scans.
+    """
+    cwd = Path(cwd_str)
+    # one scandir per directory instead of a stat() per candidate path
+    if any(e.name == 'data_lake' for e in os.scandir(cwd)):
+        return cwd
+    if any(e.name == 'data_lake' for e in os.scandir(cwd.parent)):
+        return cwd.parent
+    return None
+
+def try_read_parquet(path, columns=None, columns_regex=None):
+    """
+    Return a DataFrame if parquet exists and is readable, otherwise None.
+    Pass columns=[...] to read only those columns (Parquet is columnar, so
+    projection skips the bytes of every other column), or columns_regex=r'...'
+    to select columns by pattern without hand-listing names.
+    """
+    p = Path(path)
+    try:
+        # access(F_OK) is the cheap "does this exist" syscall (no stat struct)
+        if os.access(str(p), os.F_OK):
+            if columns is None and columns_regex is not None:
+                # read_schema parses only the footer (a few KB), so picking
+                # columns by regex costs almost nothing on a wide file
+                names = pq.read_schema(str(p)).names
+                columns = [n for n in names if re.search(columns_regex, n)]
+            # kwargs forward to pyarrow: parallel column decode + mmap'd file
+            df = pd.read_parquet(p, columns=columns, engine='pyarrow',
+                                 use_threads=True, memory_map=True)
+            return df
+        return None
+    except Exception as e:
+        print(f"⚠️ Failed to read parquet {p}: {e}")
+        # full traceback only on demand: frame formatting hits linecache and
+        # is costly when reruns hammer a still-broken path
+        if os.environ.get('NB_IO_DEBUG'):
+            traceback.print_exc(limit=1)
+        return None
+
+def try_read_csv(path, parse_dates=None, nrows_preview=0):
+    """
+    Read CSV if present. If parse_dates is given, inspect file columns first
+    and only pass the parse_dates entries that actually exist (avoids ValueError).
+    Returns DataFrame or None on missing file / failure.
+    - path: Path or str
+    - parse_dates: None or list/tuple/str of column(s) to parse as dates
+    - nrows_preview: unused, kept for backward compatibility
+    """
+    p = Path(path)
+    try:
+        if not os.access(str(p), os.F_OK):
+            return None
+
+        # If parse_dates is provided, check which of those columns exist in the file
+        cols_to_parse = None
+        if parse_dates:
+            # peek at the header only — pyarrow reads just the first block,
+            # the stdlib fallback reads one line; no full pandas parser probe
+            try:
+                import pyarrow.csv as pac
+                available_cols = set(pac.open_csv(str(p)).schema.names)
+            except Exception:
+                import csv as _csv
+                with open(p, 'r', encoding='utf-8', newline='') as fh:
+                    available_cols = set(next(_csv.reader(fh)))
+            if isinstance(parse_dates, (list, tuple)):
+                cols_to_parse = [c for c in parse_dates if c in available_cols]
+            else:
+                cols_to_parse = [parse_dates] if parse_dates in available_cols else []
+        # prefer pyarrow's multithreaded C++ parser; any failure falls back
+        # to pandas below
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pac
+            convert = pac.ConvertOptions(
+                column_types={c: pa.timestamp('ns') for c in (cols_to_parse or [])})
+            tbl = pac.read_csv(str(p), convert_options=convert)
+            return tbl.to_pandas(types_mapper=pd.ArrowDtype)
+        except Exception:
+            pass
+        # read dates as plain strings, then convert in one vectorized pass:
+        # format= keeps to_datetime on the fast C parser path and cache=True
+        # deduplicates the heavily repeated date strings of daily tables.
+        # Arrow-backed dtypes keep string columns in Arrow buffers instead
+        # of ndarray[object].
+        try:
+            df = pd.read_csv(p, dtype_backend='pyarrow')
+        except TypeError:
+            # pandas < 2.0 has no dtype_backend
+            df = pd.read_csv(p)
+        for c in (cols_to_parse or []):
+            df[c] = pd.to_datetime(df[c], format='%Y-%m-%d', errors='coerce', cache=True)
+        return df
+    except Exception as e:
+        print(f"⚠️ Failed to read CSV {p}: {e}")
+        if os.environ.get('NB_IO_DEBUG'):
+            traceback.print_exc(limit=1)
+        return None
+
+def try_read_table(stem, parse_dates=None):
+    """
+    Read '<stem>.parquet' if present (columnar, no text parsing), else
+    fall back to '<stem>.csv'. Returns DataFrame or None.
+    """
+    pq_path = Path(str(stem) + '.parquet')
+    if os.access(str(pq_path), os.F_OK):
+        return try_read_parquet(pq_path)
+    return try_read_csv(Path(str(stem) + '.csv'), parse_dates=parse_dates)
+
+def iter_parquet_batches(path, batch_size=65536, columns=None):
     """
-    Create a notebook cell structure with source_lines (list of strings).
+    Yield pandas DataFrames from a parquet file one batch at a time, so peak
+    memory stays O(batch_size x ncols) instead of O(file). Handy when the
+    feature set is bigger than notebook RAM.
+    """
+    p = Path(path)
+    if not os.access(str(p), os.F_OK):
+        return
+    pf = pq.ParquetFile(p)
+    for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+'''
+
+# What actually gets inserted into the notebook: a tiny import cell. The full
+# helper source above is written once to tools/nb_io_helpers.py next to the
+# notebook, where the kernel byte-compiles and caches it across sessions.
+IMPORT_CELL_SOURCE = '''\
+# Robust file-read helpers for the notebook (see tools/nb_io_helpers.py)
+import pandas as pd
+from tools.nb_io_helpers import try_read_parquet, try_read_csv, try_read_table, iter_parquet_batches, detect_project_root
+'''
+
+LOAD_CELL_SOURCE = '''\
+# Auto-detected paths and safe loading using the helpers above
+from pathlib import Path
+# detection is cached in the helper module, so reruns of this cell within a
+# kernel session cost a dict lookup rather than fresh directory scans
+_detected = detect_project_root(str(Path.cwd()))
+if _detected is not None:
+    project_root = _detected
+else:
+    # fallback: if project_root variable already set in notebook use it
+    try:
+        project_root
+    except NameError:
+        project_root = Path.cwd()  # last resort: assume current working dir
+    # we don't raise here to keep notebook non-fatal; prints follow
+
+print('Detected project root:', project_root)
+
+# default paths (adjust if your pipeline writes elsewhere); summaries are
+# extension-less stems — try_read_table prefers the .parquet sibling
+features_path = project_root / 'data_lake/feature_sets/features.parquet'
+trend_summary_path = project_root / 'analysis_outputs/trends/trend_summary'
+forecast_summary_path = project_root / 'analysis_outputs/forecasts/forecast_summary'
+
+# Use the robust helpers. Narrow the features read with e.g.
+#   try_read_parquet(features_path, columns=['date', 'location', 'o3_ug_m3'])
+# once you know which columns the notebook actually needs.
+# The three loads are independent and I/O-bound (pandas/pyarrow release the
+# GIL in the C readers), so overlap them: wall time ~ max instead of sum.
+from concurrent.futures import ThreadPoolExecutor
+with ThreadPoolExecutor(3) as _ex:
+    _f_features = _ex.submit(try_read_parquet, features_path)
+    _f_trend = _ex.submit(try_read_table, trend_summary_path, ['date'])
+    _f_forecast = _ex.submit(try_read_table, forecast_summary_path, ['date'])
+    df_features = _f_features.result()
+    trend_summary = _f_trend.result()
+    forecast_summary = _f_forecast.result()
+
+print('features:', 'found' if df_features is not None else 'missing')
+print('trend_summary:', 'found' if trend_summary is not None else 'missing')
+print('forecast_summary:', 'found' if forecast_summary is not None else 'missing')
+
+if df_features is not None:
+    print('✅ features shape:', df_features.shape)
+    print('Columns:', df_features.columns.tolist())
+
+# If a CSV was read without parse_dates but you want to parse later safely:
+if trend_summary is not None and 'date' in trend_summary.columns and not pd.api.types.is_datetime64_any_dtype(trend_summary['date']):
+    trend_summary['date'] = pd.to_datetime(trend_summary['date'], format='%Y-%m-%d', errors='coerce', cache=True)
+'''
+
+def make_cell(source, cell_type="code"):
+    """
+    Create a notebook cell structure. `source` may be a single string or a
+    list of line strings — the nbformat schema accepts both.
     """
     return {
         "cell_type": cell_type,
         "metadata": {},
-        "source": source_lines,
+        "source": source,
         # code cells typically include execution_count and outputs,
         # but leaving them out is acceptable; we include empty outputs/execution_count
         **({"outputs": [], "execution_count": None} if cell_type == "code" else {})
     }
 
+# The two inserted cells are constants, so build them once at import; main()
+# takes shallow copies. make_cell stays above for anything that imports it.
+_HELPER_CELL = make_cell(IMPORT_CELL_SOURCE, cell_type="code")
+_LOAD_CELL = make_cell(LOAD_CELL_SOURCE, cell_type="code")
+
+def write_helper_module(nb_path: Path) -> None:
+    """Write tools/nb_io_helpers.py next to the notebook (idempotent)."""
+    helpers_path = nb_path.parent / "tools" / "nb_io_helpers.py"
+    try:
+        current = helpers_path.read_text(encoding="utf-8")
+    except OSError:
+        current = None
+    if current != HELPER_CELL_SOURCE:
+        helpers_path.parent.mkdir(parents=True, exist_ok=True)
+        helpers_path.write_text(HELPER_CELL_SOURCE, encoding="utf-8")
+        print("Helper module written to:", helpers_path)
+
 def main(nb_path_str):
     nb_path = Path(nb_path_str)
     if not nb_path.exists():
@@ -135,30 +275,65 @@ def main(nb_path_str):
         return 1
 
     # load notebook JSON
-    with nb_path.open("r", encoding="utf-8") as f:
-        nb = json.load(f)
+    nb = _loads(nb_path.read_bytes())
 
-    # backup
+    # idempotency/upgrade detection: find our helper cell among the leading
+    # cells (join handles str or list sources). A cell with the marker but
+    # without the module import is from the old inline-helper version and
+    # gets upgraded below instead of short-circuiting.
+    cells = nb.get("cells", [])
+    marker_idx = next((i for i, c in enumerate(cells[:4])
+                       if "Robust file-read helpers for the notebook" in "".join(c.get("source", []))),
+                      None)
+    if marker_idx is not None and "tools/nb_io_helpers" in "".join(cells[marker_idx].get("source", [])):
+        # current version already in place; still keep the module file in sync
+        write_helper_module(nb_path)
+        print("Notebook already patched — nothing to do:", nb_path)
+        return 0
+
+    # backup: duplicate the on-disk bytes instead of re-serializing the parsed
+    # dict. A hardlink is O(1) and safe here because the write-back below goes
+    # to a fresh temp file + os.replace (the shared inode is never truncated);
+    # fall back to one kernel-space copy across filesystems.
     ts = datetime.now().strftime("%Y%m%dT%H%M%S")
     bak_path = nb_path.with_suffix(nb_path.suffix + f".bak.{ts}")
-    with bak_path.open("w", encoding="utf-8") as f:
-        json.dump(nb, f, indent=1, ensure_ascii=False)
+    try:
+        os.link(nb_path, bak_path)
+    except OSError:
+        shutil.copyfile(nb_path, bak_path)
     print("Backup written to:", bak_path)
 
-    # Build cells
-    helper_cell = make_cell(HELPER_CELL_SOURCE, cell_type="code")
-    load_cell = make_cell(LOAD_CELL_SOURCE, cell_type="code")
+    # keep the helper module in sync next to the notebook
+    write_helper_module(nb_path)
 
-    # Insert after first cell (index 1)
-    cells = nb.get("cells", [])
-    insert_index = 1 if len(cells) >= 1 else 0
-    cells.insert(insert_index, helper_cell)
-    cells.insert(insert_index + 1, load_cell)
+    # Build cells (copies of the precomputed constants)
+    helper_cell = dict(_HELPER_CELL)
+    load_cell = dict(_LOAD_CELL)
+
+    if marker_idx is not None:
+        # upgrade from the inline-helper version: swap the big helper cell
+        # for the import cell and refresh the adjacent load cell if it's ours
+        insert_index = marker_idx
+        cells[marker_idx] = helper_cell
+        j = marker_idx + 1
+        if j < len(cells) and "".join(cells[j].get("source", [])).startswith(
+                "# Auto-detected paths and safe loading"):
+            cells[j] = load_cell
+        else:
+            cells.insert(j, load_cell)
+    else:
+        # Insert after first cell (index 1)
+        insert_index = 1 if len(cells) >= 1 else 0
+        cells.insert(insert_index, helper_cell)
+        cells.insert(insert_index + 1, load_cell)
     nb["cells"] = cells
 
-    # write modified notebook back
-    with nb_path.open("w", encoding="utf-8") as f:
-        json.dump(nb, f, indent=1, ensure_ascii=False)
+    # write modified notebook back atomically: a crash mid-write leaves the
+    # original untouched, and the final rename is a single atomic syscall
+    tmp_path = nb_path.with_suffix(nb_path.suffix + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        f.write(_dumps(nb))
+    os.replace(tmp_path, nb_path)
     print("Patched notebook written to:", nb_path)
     print("Inserted helper cell and load cell at index", insert_index)
 